@@ -1,19 +1,60 @@
+import os
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import streamlit as st
 import folium
-from streamlit_folium import st_folium
+
+# Bump when the cleaning steps change so existing Parquet caches are rebuilt
+CLEAN_CACHE_VERSION = 1
+# Columns the recommendation engine relies on; a cache missing any of them is ignored
+CLEAN_COLUMNS = ['location', 'rating', 'cost', 'cuisines', 'votes', 'cost_category',
+                 'primary_cuisine', 'normalized_rating', 'location_lc']
 
 # Data Ingestion and Preprocessing
 def load_and_clean_data(file_path):
     try:
-        # Try loading with 'latin1' encoding to handle special characters
-        df = pd.read_csv(file_path, encoding='latin1')
-    except UnicodeDecodeError:
-        # Fallback to 'iso-8859-1' if 'latin1' fails
-        df = pd.read_csv(file_path, encoding='iso-8859-1')
-    except Exception as e:
+        # Modification time is part of the cache key so edits to the file invalidate it
+        mtime = os.path.getmtime(file_path)
+    except OSError as e:
         st.error(f"Error loading file: {str(e)}")
         return None
+    return _load_and_clean_data(file_path, mtime)
+
+def _read_csv(file_path, encoding, column_map, dtype):
+    # Read the header first so only the first matching candidate per standard column is parsed
+    header = pd.read_csv(file_path, encoding=encoding, nrows=0).columns.tolist()
+    usecols = []
+    for possible_cols in column_map.values():
+        matches = [col for col in possible_cols if col in header]
+        if matches:
+            usecols.append(matches[0])
+    # Coordinates are kept for the map view
+    usecols += [col for col in ['Latitude', 'Longitude'] if col in header]
+    try:
+        # The pyarrow engine parses columns in parallel and skips unused ones entirely
+        df = pd.read_csv(file_path, encoding=encoding, engine='pyarrow', usecols=usecols, dtype=dtype)
+    except (ImportError, ValueError):
+        # Fallback to the C engine if pyarrow is unavailable or cannot parse the file
+        df = pd.read_csv(file_path, encoding=encoding, usecols=usecols, dtype=dtype, low_memory=False)
+    return df, header
+
+# Cached as a shared resource so reruns reuse the same object; callers must not modify it in place
+@st.cache_resource(show_spinner=False, ttl=3600)
+def _load_and_clean_data(file_path, mtime):
+    # Reuse the cleaned data from a previous run if it is newer than the source file
+    cache_path = f"{os.path.splitext(file_path)[0]}.clean.v{CLEAN_CACHE_VERSION}.parquet"
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= mtime:
+        try:
+            df = pd.read_parquet(cache_path)
+        except (OSError, ImportError, pa.ArrowException):
+            df = None  # Unreadable cache, rebuild it from the CSV
+        if df is not None and all(col in df.columns for col in CLEAN_COLUMNS):
+            # Repeat the warning shown when the cache was built
+            if df.attrs.get('load_warning'):
+                st.warning(df.attrs['load_warning'])
+            df.attrs['source'] = (file_path, mtime)
+            return df
     
     # Check for columns and map to expected names
     column_map = {
@@ -25,35 +66,45 @@ def load_and_clean_data(file_path):
         'votes': ['Votes', 'votes', 'vote_count']
     }
     
+    dtypes = {col: str for standard_col in ['name', 'location', 'cuisines'] for col in column_map[standard_col]}
+    dtypes.update({'Latitude': 'float64', 'Longitude': 'float64'})
+    
+    try:
+        # Try loading with 'latin1' encoding to handle special characters
+        df, available_columns = _read_csv(file_path, 'latin1', column_map, dtypes)
+    except UnicodeDecodeError:
+        # Fallback to 'iso-8859-1' if 'latin1' fails
+        df, available_columns = _read_csv(file_path, 'iso-8859-1', column_map, dtypes)
+    except Exception as e:
+        st.error(f"Error loading file: {str(e)}")
+        return None
+    
     # Track missing columns
     missing_columns = []
-    available_columns = df.columns.tolist()
     
-    # Rename columns to standard names if they exist
+    # Rename columns to standard names if they exist, in a single rename
+    rename_map = {}
     for standard_col, possible_cols in column_map.items():
         for possible_col in possible_cols:
             if possible_col in df.columns:
-                df = df.rename(columns={possible_col: standard_col})
+                rename_map[possible_col] = standard_col
                 break
         else:
             missing_columns.append(standard_col)
+    df = df.rename(columns=rename_map)
     
     # Warn about missing columns
     if missing_columns:
-        st.warning(f"Missing columns: {missing_columns}. Using defaults where possible. Available columns: {available_columns}")
+        df.attrs['load_warning'] = f"Missing columns: {missing_columns}. Using defaults where possible. Available columns: {available_columns}"
+        st.warning(df.attrs['load_warning'])
     
     # Remove duplicates (only if name and location are available)
     duplicate_cols = [col for col in ['name', 'location'] if col in df.columns]
     if duplicate_cols:
         df = df.drop_duplicates(subset=duplicate_cols)
     
-    # Drop irrelevant columns
-    columns_to_drop = ['Restaurant ID', 'Country Code', 'Currency', 'Has Table booking', 'Has Online delivery', 
-                      'Is delivering now', 'Switch to order menu', 'Price range', 'Rating color', 'Rating text']
-    df = df.drop(columns=[col for col in columns_to_drop if col in df.columns])
-    
-    # Handle missing values
-    df = df.dropna(thresh=len(df.columns) * 0.7)  # Drop rows with >30% missing values
+    # Handle missing values (only name and location are required, other columns get defaults below)
+    df = df.dropna(subset=[col for col in ['name', 'location'] if col in df.columns])
     
     # Handle rating
     if 'rating' in df.columns:
@@ -86,77 +137,121 @@ def load_and_clean_data(file_path):
     if 'votes' not in df.columns:
         df['votes'] = 0
     
+    # Use Arrow-backed strings so .str operations run on Arrow compute kernels
+    for col in [col for col in ['name', 'location', 'cuisines'] if col in df.columns]:
+        df[col] = df[col].astype('string[pyarrow]')
+    
     # Feature Engineering
-    def categorize_cost(cost):
-        try:
-            cost = float(cost)
-            if cost < 300:
-                return 'low'
-            elif cost < 700:
-                return 'medium'
-            else:
-                return 'high'
-        except (ValueError, TypeError):
-            return 'medium'  # Default to medium if cost is invalid
-    
-    df['cost_category'] = df['cost'].apply(categorize_cost)
+    # Bin cost into categories: below 300 is low, below 700 is medium, otherwise high
+    df['cost_category'] = pd.cut(df['cost'], bins=[-np.inf, 300, 700, np.inf], labels=['low', 'medium', 'high'], right=False)
     
     # Extract primary cuisine
-    df['primary_cuisine'] = df['cuisines'].apply(lambda x: x.split(',')[0].strip() if isinstance(x, str) else 'unknown')
+    df['primary_cuisine'] = df['cuisines'].str.split(',', n=1).str[0].str.strip().fillna('unknown')
     
     # Normalize ratings to 1-5 scale
     df['normalized_rating'] = df['rating'].clip(1, 5)
     
+    # Store low-cardinality columns as categoricals so comparisons use integer codes
+    for col in ['cost_category', 'primary_cuisine']:
+        df[col] = df[col].astype('category')
+    
+    # Lowercase copy of the location filter column so queries don't recompute it
+    # (cuisines are matched on categories and cost_category labels are already lowercase)
+    df['location_lc'] = df['location'].str.lower()
+    
+    # Persist the cleaned data so the next cold start can skip parsing and cleaning
+    try:
+        df.to_parquet(cache_path, compression='zstd')
+    except (OSError, ImportError, pa.ArrowException):
+        pass  # Caching is best-effort (e.g. read-only directory)
+    
+    # Identifies this version of the data for the filter cache
+    df.attrs['source'] = (file_path, mtime)
     return df
 
 # Recommendation Engine
+def _apply_filters(df, cuisines, budget, location):
+    # Filter based on available columns
+    conditions = []
+    if 'primary_cuisine' in df.columns:
+        # Substring-match the few cuisine categories once, then select rows by hash lookup
+        matched_cuisines = [cat for cat in df['primary_cuisine'].cat.categories if any(c in cat.lower() for c in cuisines)]
+        conditions.append(df['primary_cuisine'].isin(matched_cuisines))
+    if 'cost_category' in df.columns:
+        conditions.append(df['cost_category'] == budget)
+    if 'location_lc' in df.columns:
+        # Literal substring match so characters like '.' or '(' in user input are not treated as regex
+        conditions.append(df['location_lc'].str.contains(location, regex=False, na=False))
+    
+    # Combine all conditions into one mask and take a single copy of the matching rows
+    mask = np.ones(len(df), dtype=bool)
+    for condition in conditions:
+        mask &= condition.to_numpy(dtype=bool)
+    filtered_df = df.loc[mask].copy()
+    # The result is no longer the full source data, so it must not share its cache key
+    filtered_df.attrs.pop('source', None)
+    return filtered_df
+
+# Keyed on the source (file_path, mtime) rather than the dataframe, which is not hashed
+@st.cache_data(show_spinner=False, max_entries=100, ttl=3600)
+def _apply_filters_cached(_df, source, cuisines, budget, location):
+    return _apply_filters(_df, cuisines, budget, location)
+
 def filter_and_rank_restaurants(df, cuisines, budget, location, strategy, top_n=10):
     if df is None:
-        return pd.DataFrame()
+        return pd.DataFrame(), pd.DataFrame()
     
     # Convert inputs to lowercase for case-insensitive matching
     cuisines = [c.lower() for c in cuisines]
     location = location.lower()
     
-    # Filter based on available columns
-    conditions = []
-    if 'primary_cuisine' in df.columns:
-        conditions.append(df['primary_cuisine'].str.lower().str.contains('|'.join(cuisines), na=False))
-    if 'cost_category' in df.columns:
-        conditions.append(df['cost_category'].str.lower() == budget.lower())
-    if 'location' in df.columns:
-        conditions.append(df['location'].str.lower().str.contains(location, na=False))
-    
-    # Apply filters if any conditions exist
-    if conditions:
-        filtered_df = df
-        for condition in conditions:
-            filtered_df = filtered_df[condition]
+    # Filtering is cached per source data and preferences; sorting the cuisines keeps the key order-independent
+    source = df.attrs.get('source')
+    if source is not None:
+        filtered_df = _apply_filters_cached(df, source, tuple(sorted(cuisines)), budget.lower(), location)
     else:
-        filtered_df = df
+        filtered_df = _apply_filters(df, cuisines, budget.lower(), location)
+    
+    top_restaurants = rank_restaurants(filtered_df, cuisines, budget, strategy, top_n)
+    
+    # Also return the filtered dataframe so callers can re-rank without filtering again
+    return top_restaurants, filtered_df
+
+def rank_restaurants(filtered_df, cuisines, budget, strategy, top_n=10):
+    cuisines = [c.lower() for c in cuisines]
     
     # Ranking based on selected strategy
     if strategy == "A: Rating-heavy":
-        filtered_df['score'] = (filtered_df['normalized_rating'] * 0.8) + \
-                             (filtered_df['votes'].apply(lambda x: min(x, 1000) / 1000 if pd.notnull(x) else 0) * 0.2)
+        rating_weight, votes_weight = 0.8, 0.2
     else:  # Strategy B: Votes-heavy
-        filtered_df['score'] = (filtered_df['normalized_rating'] * 0.5) + \
-                             (filtered_df['votes'].apply(lambda x: min(x, 1000) / 1000 if pd.notnull(x) else 0) * 0.5)
+        rating_weight, votes_weight = 0.5, 0.5
     
-    # Sort and select top N
-    top_restaurants = filtered_df.sort_values(by='score', ascending=False).head(top_n)
+    # Cap votes at 1000 and scale to 0-1
+    votes_norm = filtered_df['votes'].clip(upper=1000).fillna(0).to_numpy() / 1000.0
+    filtered_df['score'] = filtered_df['normalized_rating'].to_numpy() * rating_weight + votes_norm * votes_weight
+    
+    # Select top N without sorting the whole frame
+    top_restaurants = filtered_df.nlargest(top_n, 'score')
     
     # Generate explanations
-    top_restaurants['explanation'] = top_restaurants.apply(
-        lambda row: f"Matched on {', '.join(cuisines)} cuisine" + 
-                    (f", {budget} budget" if 'cost_category' in row else "") + 
-                    (f", and {row['normalized_rating']:.1f} rating from {row['votes'] if pd.notnull(row['votes']) else 0} votes" if 'rating' in row else "") +
-                    f" (Strategy: {strategy})",
-        axis=1
-    )
+    explanation = f"Matched on {', '.join(cuisines)} cuisine"
+    if 'cost_category' in top_restaurants.columns:
+        explanation += f", {budget} budget"
+    if 'rating' in top_restaurants.columns:
+        explanation = (explanation + ", and " + top_restaurants['normalized_rating'].round(1).astype(str) +
+                       " rating from " + top_restaurants['votes'].fillna(0).astype(int).astype(str) + " votes")
+    top_restaurants['explanation'] = explanation + f" (Strategy: {strategy})"
     
     return top_restaurants
 
+# Map View
+@st.cache_data(show_spinner=False)
+def build_map_html(lat, lon, name):
+    # Render the map to static HTML once per restaurant instead of on every rerun
+    m = folium.Map(location=[lat, lon], zoom_start=15)
+    folium.Marker([lat, lon], popup=name).add_to(m)
+    return m.get_root().render()
+
 # Streamlit UI
 def main():
     st.title("Restaurant Recommendation System")
@@ -190,7 +285,7 @@ def main():
         
         # Get recommendations
         if cuisines and budget and location:
-            recommendations = filter_and_rank_restaurants(df, cuisines, budget, location, strategy)
+            recommendations, filtered_df = filter_and_rank_restaurants(df, cuisines, budget, location, strategy)
             # Store recommendations and preferences in session state
             st.session_state.recommendations = recommendations
             st.session_state.preferences = {
@@ -200,16 +295,6 @@ def main():
                 'strategy': strategy
             }
             # Store filtered dataframe for re-ranking
-            conditions = []
-            if 'primary_cuisine' in df.columns:
-                conditions.append(df['primary_cuisine'].str.lower().str.contains('|'.join([c.lower() for c in cuisines]), na=False))
-            if 'cost_category' in df.columns:
-                conditions.append(df['cost_category'].str.lower() == budget.lower())
-            if 'location' in df.columns:
-                conditions.append(df['location'].str.lower().str.contains(location.lower(), na=False))
-            filtered_df = df
-            for condition in conditions:
-                filtered_df = filtered_df[condition]
             st.session_state.filtered_df = filtered_df
         else:
             st.warning("Please provide all preferences (cuisine, budget, location).")
@@ -223,21 +308,20 @@ def main():
         
         if not recommendations.empty:
             st.header("Top Recommendations")
-            for _, row in recommendations.iterrows():
-                st.subheader(row['name'] if 'name' in row else 'Unknown Restaurant')
-                st.write(f"Cuisine: {row['primary_cuisine']}")
-                if 'cost_category' in row:
-                    st.write(f"Price Category: {row['cost_category']}")
-                if 'normalized_rating' in row:
-                    st.write(f"Rating: {row['normalized_rating']:.1f}")
-                st.write(f"Explanation: {row['explanation']}")
+            for row in recommendations.itertuples(index=False):
+                st.subheader(getattr(row, 'name', 'Unknown Restaurant'))
+                st.write(f"Cuisine: {row.primary_cuisine}")
+                if hasattr(row, 'cost_category'):
+                    st.write(f"Price Category: {row.cost_category}")
+                if hasattr(row, 'normalized_rating'):
+                    st.write(f"Rating: {row.normalized_rating:.1f}")
+                st.write(f"Explanation: {row.explanation}")
                 st.markdown("---")
                 
                 # Map view (using Latitude and Longitude)
-                if 'Latitude' in row and 'Longitude' in row and pd.notnull(row['Latitude']) and pd.notnull(row['Longitude']):
-                    m = folium.Map(location=[row['Latitude'], row['Longitude']], zoom_start=15)
-                    folium.Marker([row['Latitude'], row['Longitude']], popup=row['name'] if 'name' in row else 'Restaurant').add_to(m)
-                    st_folium(m, width=700, height=300)
+                if hasattr(row, 'Latitude') and hasattr(row, 'Longitude') and pd.notnull(row.Latitude) and pd.notnull(row.Longitude):
+                    map_html = build_map_html(row.Latitude, row.Longitude, getattr(row, 'name', 'Restaurant'))
+                    st.iframe(map_html, width=700, height=300)
         else:
             st.warning(f"No restaurants match your preferences (cuisine: {', '.join(preferences['cuisines'])}, budget: {preferences['budget']}, location: {preferences['location']}, strategy: {preferences['strategy']}). Try adjusting your filters or using a broader location (e.g., 'Bangalore').")
         
@@ -249,12 +333,11 @@ def main():
                 rerank_button = st.form_submit_button(label="Re-rank Recommendations")
                 
                 if rerank_button:
-                    # Re-rank using the stored filtered dataframe and new strategy
-                    recommendations = filter_and_rank_restaurants(
+                    # Re-rank the stored filtered dataframe with the new strategy, skipping the filters
+                    recommendations = rank_restaurants(
                         st.session_state.filtered_df,
                         preferences['cuisines'],
                         preferences['budget'],
-                        preferences['location'],
                         new_strategy
                     )
                     st.session_state.recommendations = recommendations